@@ -1,10 +1,11 @@
-from sqlalchemy import create_engine, event, inspect
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 from app.config import settings
 import logging
 import os
+import sqlite3
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -84,62 +85,54 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create Base class for models
 Base = declarative_base()
 
+def _query_database_info(conn) -> str:
+    """Get the database version string over an open connection."""
+    if settings.DATABASE_URL.startswith('sqlite'):
+        version = conn.execute(text("SELECT sqlite_version()")).scalar()
+        return f"SQLite {version}"
+    elif settings.DATABASE_URL.startswith('postgresql'):
+        version = conn.execute(text("SELECT version()")).scalar()
+        return f"PostgreSQL {version.split()[1]}"
+    else:
+        conn.execute(text("SELECT 1"))
+        return "Unknown database"
+
 def get_database_info():
     """Get database information for logging/debugging."""
     try:
         with engine.connect() as conn:
-            if settings.DATABASE_URL.startswith('sqlite'):
-                result = conn.execute("SELECT sqlite_version()").fetchone()
-                return f"SQLite {result[0]}"
-            elif settings.DATABASE_URL.startswith('postgresql'):
-                result = conn.execute("SELECT version()").fetchone()
-                return f"PostgreSQL {result[0].split()[1]}"
-            else:
-                return "Unknown database"
+            return _query_database_info(conn)
     except Exception as e:
         return f"Database info unavailable: {e}"
 
 async def create_tables():
-    """Create all database tables if they don't exist."""
+    """Create all database tables if they don't exist.
+    
+    Existing tables are read once and compared against the model metadata, so
+    a normal startup against an initialized schema skips ``create_all`` (and
+    its per-table existence checks) entirely.
+    """
     try:
-        # Check if tables already exist
-        inspector = inspect(engine)
-        existing_tables = inspector.get_table_names()
-        
-        if existing_tables:
-            logger.info(f"Database tables already exist: {', '.join(sorted(existing_tables))}")
-            logger.info("Verifying table schema...")
-        else:
-            logger.info("No existing tables found, creating new database schema...")
-        
         # Import all models to ensure they're registered with Base
         from app.models import (
             User, Receipt, InventoryItem, MarketplaceListing, 
             Message, ShelfLifeData, Order
         )
         
-        # This will create tables only if they don't exist
-        Base.metadata.create_all(bind=engine)
-        
-        # Check what we have now
-        updated_tables = inspect(engine).get_table_names()
+        existing_tables = set(inspect(engine).get_table_names())
+        missing_tables = set(Base.metadata.tables) - existing_tables
         
-        if not existing_tables and updated_tables:
-            logger.info(f"✅ Created {len(updated_tables)} database tables: {', '.join(sorted(updated_tables))}")
-        elif existing_tables:
+        if not missing_tables:
             logger.info("✅ Database schema verified - all tables exist")
-            
-            # Log table counts for verification
-            try:
-                with engine.connect() as conn:
-                    for table in updated_tables:
-                        count_result = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
-                        count = count_result[0] if count_result else 0
-                        logger.debug(f"   Table '{table}': {count} records")
-            except Exception as e:
-                logger.debug(f"Could not get table counts: {e}")
         else:
-            logger.info("✅ Database tables ready")
+            if existing_tables:
+                logger.info(f"Creating missing database tables: {', '.join(sorted(missing_tables))}")
+            else:
+                logger.info("No existing tables found, creating new database schema...")
+            
+            # This will create tables only if they don't exist
+            Base.metadata.create_all(bind=engine)
+            logger.info(f"✅ Created {len(missing_tables)} database tables: {', '.join(sorted(missing_tables))}")
         
         # Log database information
         db_info = get_database_info()
@@ -162,17 +155,13 @@ async def check_database_health():
     """Check database health and connectivity."""
     try:
         with engine.connect() as conn:
-            # Simple connectivity test
-            if settings.DATABASE_URL.startswith('sqlite'):
-                result = conn.execute("SELECT 1").fetchone()
-            elif settings.DATABASE_URL.startswith('postgresql'):
-                result = conn.execute("SELECT 1").fetchone()
-            else:
-                result = conn.execute("SELECT 1").fetchone()
+            # The read-only version query doubles as the connectivity test:
+            # one connection, one round trip, no writes
+            database_info = _query_database_info(conn)
             
             return {
                 'status': 'healthy',
-                'database': get_database_info(),
+                'database': database_info,
                 'url_masked': settings.DATABASE_URL.split('@')[0] + '@***' if '@' in settings.DATABASE_URL else settings.DATABASE_URL
             }
     except Exception as e:
@@ -182,6 +171,25 @@ async def check_database_health():
             'database': 'unavailable'
         }
 
+def _sqlite_file_in_use(db_path: str) -> bool:
+    """Return True if another connection has the SQLite file open."""
+    if not os.path.exists(db_path):
+        return False
+    
+    probe = sqlite3.connect(db_path, timeout=0.5, isolation_level=None)
+    try:
+        # Exclusive locking mode also needs the WAL index to itself, so unlike a
+        # plain BEGIN EXCLUSIVE this is refused while any other connection is
+        # open, even an idle one
+        probe.execute("PRAGMA locking_mode=EXCLUSIVE")
+        probe.execute("BEGIN EXCLUSIVE")
+        probe.execute("ROLLBACK")
+        return False
+    except sqlite3.OperationalError:
+        return True
+    finally:
+        probe.close()
+
 def reset_database():
     """Drop and recreate all database tables. Use with caution!"""
     try:
@@ -193,9 +201,33 @@ def reset_database():
             Message, ShelfLifeData, Order
         )
         
-        # Drop all tables
-        Base.metadata.drop_all(bind=engine)
-        logger.info("✅ All tables dropped")
+        db_path = settings.DATABASE_URL.replace('sqlite:///', '').replace('sqlite://', '')
+        is_sqlite_file = settings.is_sqlite() and db_path and not db_path.startswith(':memory:')
+        if is_sqlite_file:
+            # Close pooled connections first so they don't count as other users
+            engine.dispose()
+        
+        if is_sqlite_file and not _sqlite_file_in_use(db_path):
+            # Deleting the file is constant-time, unlike DROP TABLE on large tables.
+            # Remove stale WAL sidecars too.
+            for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.info("✅ SQLite database file removed")
+        elif settings.is_postgresql():
+            # One statement instead of one DROP TABLE per table
+            with engine.begin() as conn:
+                conn.execute(text("DROP SCHEMA public CASCADE"))
+                conn.execute(text("CREATE SCHEMA public"))
+            logger.info("✅ Public schema dropped and recreated")
+        else:
+            # A file still open elsewhere (e.g. a running API server) must not be
+            # unlinked: that process would keep using the deleted file
+            if is_sqlite_file:
+                logger.warning("⚠️ SQLite database is open in another process; dropping tables instead")
+            # Drop all tables
+            Base.metadata.drop_all(bind=engine)
+            logger.info("✅ All tables dropped")
         
         # Recreate all tables
         Base.metadata.create_all(bind=engine)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, case, literal
 from typing import Optional, List
 from datetime import datetime, timedelta
 import uuid
@@ -213,23 +213,22 @@ class InventoryService:
     def update_item_statuses(self):
         """Update item statuses based on expiry dates."""
         now = datetime.utcnow()
-        
-        # Mark expired items
-        self.db.query(InventoryItem).filter(
-            and_(
-                InventoryItem.predicted_expiry_date < now,
-                InventoryItem.status == ItemStatus.FRESH
-            )
-        ).update({InventoryItem.status: ItemStatus.EXPIRED})
-
-        # Mark nearing expiry (within 3 days)
         three_days = now + timedelta(days=3)
+        
+        # One UPDATE for both transitions: fresh items already past expiry become
+        # expired, the rest expiring within 3 days become nearing. CASE results are
+        # bound with the column's Enum type so they're stored as enum names.
+        status_type = InventoryItem.status.type
         self.db.query(InventoryItem).filter(
             and_(
                 InventoryItem.predicted_expiry_date <= three_days,
-                InventoryItem.predicted_expiry_date >= now,
                 InventoryItem.status == ItemStatus.FRESH
             )
-        ).update({InventoryItem.status: ItemStatus.NEARING})
+        ).update({
+            InventoryItem.status: case(
+                (InventoryItem.predicted_expiry_date < now, literal(ItemStatus.EXPIRED, status_type)),
+                else_=literal(ItemStatus.NEARING, status_type)
+            )
+        })
 
         self.db.commit()
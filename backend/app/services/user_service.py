@@ -3,12 +3,11 @@ from sqlalchemy import and_, func
 from typing import Optional, List
 from datetime import datetime
 import uuid
-from passlib.context import CryptContext
 
 from app.models import User, InventoryItem, MarketplaceListing
 from app.schemas import UserCreate, UserUpdate
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Share AuthService's CryptContext so bcrypt backend setup happens once per process
+from app.services.auth_service import pwd_context
 
 class UserService:
     def __init__(self, db: Session):
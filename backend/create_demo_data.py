@@ -4,102 +4,125 @@
 Create demo data for ShelfLife.AI backend testing.
 This script creates demo users, inventory items, and marketplace listings.
 
-Fixed version that ensures proper authentication setup.
+Usage:
+    python create_demo_data.py                # Recreate demo data from scratch
+    python create_demo_data.py --mode skip    # Keep existing demo users
+    python create_demo_data.py --verify       # Also verify demo logins
 """
 
 import sys
 import os
+import argparse
+import traceback
 from datetime import datetime, timedelta
 import uuid
-from passlib.context import CryptContext
+from sqlalchemy import select
 
 # Add the current directory to Python path
 sys.path.insert(0, os.getcwd())
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.auth_service import pwd_context as auth_pwd_context
+from demo_fixtures import DEMO_USERS, DEMO_ITEMS, DEMO_LISTINGS, DEMO_EMAILS
 
-def create_demo_data():
-    """Create demo users and data for testing."""
+# Password hashing context for throwaway demo accounts, derived from the shared
+# AuthService context. bcrypt cost is exponential in rounds, so use the
+# minimum (4) instead of the default (12); the hashes still verify in AuthService.
+pwd_context = auth_pwd_context.copy(bcrypt__rounds=4)
+
+# Fixed offsets reused for every seeded row
+PURCHASE_AGE = timedelta(days=2)
+SELLING_CUTOFF = timedelta(hours=6)  # Stop selling 6 hours before expiry
+
+def _owner_email(index: int) -> str:
+    """Email of the demo user that owns fixture item/listing `index`."""
+    return DEMO_USERS[index % len(DEMO_USERS)]["email"]
+
+def _verify_demo_logins(db):
+    """Authenticate every demo user against the database and report the result."""
+    print("\n🔐 Testing demo user authentication...")
+    from app.services.auth_service import AuthService
+    auth_service = AuthService(db)
+    
+    for user_data in DEMO_USERS:
+        user = auth_service.authenticate_user(user_data["email"], user_data["password"])
+        if user:
+            print(f"   ✅ Authentication test passed: {user_data['email']}")
+        else:
+            print(f"   ❌ Authentication test failed: {user_data['email']}")
+
+def create_demo_data(mode: str = "wipe", verify: bool = False):
+    """Create demo users and data for testing.
+    
+    Args:
+        mode: "wipe" deletes existing demo users and their data before seeding;
+            "skip" keeps existing demo users and only seeds the missing ones.
+        verify: Re-authenticate each demo user after seeding (slow, for CI smoke tests).
+    """
     print("🎭 Creating ShelfLife.AI Demo Data...")
     
     try:
         from app.config import settings
         from app.database import SessionLocal
-        from app.models import User, InventoryItem, MarketplaceListing, ItemStatus, ItemSource, ListingStatus
+        from app.models import User, InventoryItem, MarketplaceListing, ItemSource, ItemStatus, ListingStatus
         
         db = SessionLocal()
         
-        # Clear existing demo data if it exists
-        print("🧹 Cleaning up existing demo data...")
-        demo_emails = ["demo@shelflife.ai", "alice@example.com", "bob@example.com"]
-        
-        for email in demo_emails:
-            existing_user = db.query(User).filter(User.email == email).first()
-            if existing_user:
-                print(f"   🗑️  Removing existing user: {email}")
-                # Delete related inventory items
-                db.query(InventoryItem).filter(InventoryItem.user_id == existing_user.id).delete()
-                # Delete related marketplace listings
-                db.query(MarketplaceListing).filter(MarketplaceListing.seller_id == existing_user.id).delete()
-                # Delete user
-                db.delete(existing_user)
+        if mode == "wipe":
+            # Clear existing demo data if it exists
+            print("🧹 Cleaning up existing demo data...")
+            
+            # Bulk deletes keyed on a subquery: three statements regardless of user count
+            demo_user_ids = select(User.id).where(User.email.in_(DEMO_EMAILS))
+            # Listings reference inventory items, so they go first
+            db.query(MarketplaceListing).filter(
+                MarketplaceListing.seller_id.in_(demo_user_ids)
+            ).delete(synchronize_session=False)
+            db.query(InventoryItem).filter(
+                InventoryItem.user_id.in_(demo_user_ids)
+            ).delete(synchronize_session=False)
+            removed_users = db.query(User).filter(
+                User.email.in_(DEMO_EMAILS)
+            ).delete(synchronize_session=False)
+            if removed_users:
+                print(f"   🗑️  Removed {removed_users} existing demo user(s)")
+            
+            users_to_create = DEMO_USERS
+        else:
+            # Keep existing demo users (and their data) untouched; one query for all emails
+            existing_emails = {
+                email for (email,) in db.query(User.email).filter(User.email.in_(DEMO_EMAILS))
+            }
+            users_to_create = []
+            for user_data in DEMO_USERS:
+                if user_data["email"] in existing_emails:
+                    print(f"   ⏭️  Skipping existing user: {user_data['email']}")
+                else:
+                    users_to_create.append(user_data)
+            
+            if not users_to_create:
+                print("✅ All demo users already exist, nothing to create")
+                # Still verify: "--mode skip --verify" is the CI smoke-test case
+                if verify:
+                    _verify_demo_logins(db)
+                db.close()
+                return
         
-        db.commit()
+        # Pre-generate primary keys so FK references never need a round trip
+        user_ids = [uuid.uuid4() for _ in users_to_create]
         
-        # Demo users with properly hashed passwords
-        demo_users = [
-            {
-                "email": "demo@shelflife.ai",
-                "username": "demouser",
-                "password": "demo123",
-                "first_name": "Demo",
-                "last_name": "User",
-                "phone": "+1234567890",
-                "city": "San Francisco",
-                "state": "CA",
-                "country": "USA",
-                "latitude": 37.7749,
-                "longitude": -122.4194
-            },
-            {
-                "email": "alice@example.com",
-                "username": "alice_chef",
-                "password": "alice123",
-                "first_name": "Alice",
-                "last_name": "Smith",
-                "phone": "+1234567891",
-                "city": "San Francisco",
-                "state": "CA", 
-                "country": "USA",
-                "latitude": 37.7849,
-                "longitude": -122.4094
-            },
-            {
-                "email": "bob@example.com",
-                "username": "bob_foodie",
-                "password": "bob123",
-                "first_name": "Bob",
-                "last_name": "Johnson",
-                "phone": "+1234567892",
-                "city": "San Francisco",
-                "state": "CA",
-                "country": "USA", 
-                "latitude": 37.7649,
-                "longitude": -122.4294
-            }
-        ]
+        created_users = {}  # email -> User, only for users seeded in this run
         
-        created_users = []
+        # Single timestamp for the whole seed run
+        now = datetime.utcnow()
         
         print("👥 Creating demo users...")
-        for user_data in demo_users:
+        for user_id, user_data in zip(user_ids, users_to_create):
             # Hash password properly
             hashed_password = pwd_context.hash(user_data["password"])
             
             # Create user with explicit UUID
             user = User(
-                id=uuid.uuid4(),
+                id=user_id,
                 email=user_data["email"],
                 username=user_data["username"],
                 hashed_password=hashed_password,
@@ -113,98 +136,39 @@ def create_demo_data():
                 country=user_data["country"],
                 latitude=user_data["latitude"],
                 longitude=user_data["longitude"],
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                created_at=now,
+                updated_at=now
             )
             
             db.add(user)
-            created_users.append(user)
+            created_users[user_data["email"]] = user
             print(f"   ✅ Created user: {user_data['email']} (Password: {user_data['password']})")
         
-        # Commit users first
-        db.commit()
-        
-        # Refresh users to get their IDs
-        for user in created_users:
-            db.refresh(user)
+        # Flush users first; everything is committed once at the end.
+        # IDs are client-generated, so no refresh is needed.
+        db.flush()
         
         print(f"✅ Created {len(created_users)} users")
         
         # Create demo inventory items
         print("🥕 Creating demo inventory items...")
-        demo_items = [
-            {
-                "name": "Organic Bananas",
-                "category": "Fruits",
-                "brand": "Organic Valley",
-                "quantity": 6,
-                "unit": "pieces",
-                "purchase_price": 4.99,
-                "days_until_expiry": 3,
-                "status": ItemStatus.NEARING
-            },
-            {
-                "name": "Greek Yogurt",
-                "category": "Dairy",
-                "brand": "Chobani",
-                "quantity": 1,
-                "unit": "container",
-                "purchase_price": 5.99,
-                "days_until_expiry": 2,
-                "status": ItemStatus.NEARING
-            },
-            {
-                "name": "Sourdough Bread", 
-                "category": "Bakery",
-                "brand": "Local Bakery",
-                "quantity": 1,
-                "unit": "loaf",
-                "purchase_price": 6.50,
-                "days_until_expiry": 1,
-                "status": ItemStatus.NEARING
-            },
-            {
-                "name": "Baby Spinach",
-                "category": "Vegetables", 
-                "brand": "Organic",
-                "quantity": 1,
-                "unit": "bag",
-                "purchase_price": 3.99,
-                "days_until_expiry": 5,
-                "status": ItemStatus.FRESH
-            },
-            {
-                "name": "Whole Milk",
-                "category": "Dairy",
-                "brand": "Horizon",
-                "quantity": 1,
-                "unit": "gallon",
-                "purchase_price": 4.99,
-                "days_until_expiry": 7,
-                "status": ItemStatus.FRESH
-            },
-            {
-                "name": "Chicken Breast",
-                "category": "Meat",
-                "brand": "Fresh Market",
-                "quantity": 2,
-                "unit": "lbs",
-                "purchase_price": 8.99,
-                "days_until_expiry": 2,
-                "status": ItemStatus.NEARING
-            }
-        ]
         
+        # Fixture rows have a fixed owner (DEMO_USERS round-robin), so "skip" mode
+        # only seeds the rows of the users it just created
+        item_ids = {}  # DEMO_ITEMS index -> id, for the items seeded in this run
         created_items = []
-        for i, item_data in enumerate(demo_items):
-            user = created_users[i % len(created_users)]  # Distribute items among users
+        for i, item_data in enumerate(DEMO_ITEMS):
+            owner = created_users.get(_owner_email(i))
+            if owner is None:
+                continue
             
-            purchase_date = datetime.utcnow() - timedelta(days=2)
+            purchase_date = now - PURCHASE_AGE
             expiry_date = purchase_date + timedelta(days=item_data["days_until_expiry"])
             
+            item_ids[i] = uuid.uuid4()
             item = InventoryItem(
-                id=uuid.uuid4(),
-                user_id=user.id,
+                id=item_ids[i],
+                user_id=owner.id,
                 name=item_data["name"],
                 category=item_data["category"],
                 brand=item_data["brand"],
@@ -215,69 +179,37 @@ def create_demo_data():
                 store_name="Demo Store",
                 predicted_expiry_date=expiry_date,
                 confidence_score=0.85,
-                status=item_data["status"],
+                status=ItemStatus[item_data["status"]],
                 source=ItemSource.RECEIPT,
-                created_at=datetime.utcnow(),
-                last_updated=datetime.utcnow()
+                created_at=now,
+                last_updated=now
             )
             
             db.add(item)
             created_items.append(item)
             print(f"   ✅ Created item: {item_data['name']} (expires in {item_data['days_until_expiry']} days)")
         
-        db.commit()
+        db.flush()
         print(f"✅ Created {len(created_items)} inventory items")
         
         # Create demo marketplace listings
         print("🛒 Creating demo marketplace listings...")
-        demo_listings = [
-            {
-                "title": "Fresh Organic Bananas - Expiring Soon!",
-                "description": "6 organic bananas, perfect for smoothies or banana bread. Expiring in 2 days, great deal!",
-                "category": "Fruits",
-                "quantity": 6,
-                "unit": "pieces",
-                "price": 2.99,
-                "days_until_expiry": 2,
-                "delivery_available": True,
-                "delivery_radius_miles": 5.0
-            },
-            {
-                "title": "Greek Yogurt - Quick Sale",
-                "description": "Unopened Chobani Greek yogurt, expires tomorrow. Perfect for someone who will use it right away!",
-                "category": "Dairy", 
-                "quantity": 1,
-                "unit": "container",
-                "price": 3.99,
-                "days_until_expiry": 1,
-                "delivery_available": False,
-                "delivery_radius_miles": 0
-            },
-            {
-                "title": "Artisan Sourdough Bread",
-                "description": "Fresh sourdough from local bakery. Expires today but still perfectly good! Great for toast or bread pudding.",
-                "category": "Bakery",
-                "quantity": 1,
-                "unit": "loaf", 
-                "price": 4.00,
-                "days_until_expiry": 0,
-                "delivery_available": True,
-                "delivery_radius_miles": 3.0
-            }
-        ]
         
         created_listings = []
-        for i, listing_data in enumerate(demo_listings):
-            user = created_users[i % len(created_users)]  # Distribute listings among users
-            item = created_items[i % len(created_items)]   # Link to inventory items
+        for i, listing_data in enumerate(DEMO_LISTINGS):
+            # Listing i sells item i, which has the same owner
+            user = created_users.get(_owner_email(i))
+            item_id = item_ids.get(i % len(DEMO_ITEMS))
+            if user is None or item_id is None:
+                continue
             
-            expiry_date = datetime.utcnow() + timedelta(days=listing_data["days_until_expiry"])
-            available_until = expiry_date - timedelta(hours=6)  # Stop selling 6 hours before expiry
+            expiry_date = now + timedelta(days=listing_data["days_until_expiry"])
+            available_until = expiry_date - SELLING_CUTOFF
             
             listing = MarketplaceListing(
                 id=uuid.uuid4(),
                 seller_id=user.id,
-                inventory_item_id=item.id,
+                inventory_item_id=item_id,
                 title=listing_data["title"],
                 description=listing_data["description"],
                 category=listing_data["category"],
@@ -292,38 +224,31 @@ def create_demo_data():
                 delivery_available=listing_data["delivery_available"],
                 delivery_radius_miles=listing_data["delivery_radius_miles"],
                 expiry_date=expiry_date,
-                available_from=datetime.utcnow(),
+                available_from=now,
                 available_until=available_until,
                 status=ListingStatus.ACTIVE,
                 views_count=0,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                created_at=now,
+                updated_at=now
             )
             
             db.add(listing)
             created_listings.append(listing)
             print(f"   ✅ Created listing: {listing_data['title']} (${listing_data['price']})")
         
+        # Single commit for the cleanup and all inserts
         db.commit()
         print(f"✅ Created {len(created_listings)} marketplace listings")
         
-        # Test authentication for each demo user
-        print("\n🔐 Testing demo user authentication...")
-        from app.services.auth_service import AuthService
-        auth_service = AuthService(db)
-        
-        for user_data in demo_users:
-            user = auth_service.authenticate_user(user_data["email"], user_data["password"])
-            if user:
-                print(f"   ✅ Authentication test passed: {user_data['email']}")
-            else:
-                print(f"   ❌ Authentication test failed: {user_data['email']}")
+        # Test authentication for each demo user (full bcrypt verify, so opt-in)
+        if verify:
+            _verify_demo_logins(db)
         
         print("\n🎉 Demo data created successfully!")
         print("=" * 60)
         print("📧 Demo Login Credentials:")
         print("")
-        for user_data in demo_users:
+        for user_data in DEMO_USERS:
             print(f"   Email: {user_data['email']}")
             print(f"   Password: {user_data['password']}")
             print(f"   Name: {user_data['first_name']} {user_data['last_name']}")
@@ -340,9 +265,22 @@ def create_demo_data():
         
     except Exception as e:
         print(f"❌ Demo data creation failed: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
 if __name__ == "__main__":
-    create_demo_data()
+    parser = argparse.ArgumentParser(description="Create ShelfLife.AI demo data")
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='Verify each demo user can authenticate after seeding'
+    )
+    parser.add_argument(
+        '--mode',
+        choices=['wipe', 'skip'],
+        default='wipe',
+        help='wipe: recreate demo users from scratch; skip: keep existing demo users'
+    )
+    args = parser.parse_args()
+    
+    create_demo_data(mode=args.mode, verify=args.verify)
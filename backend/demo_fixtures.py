@@ -0,0 +1,161 @@
+"""
+Demo fixtures for ShelfLife.AI.
+Shared literal data for the demo users, inventory items and marketplace listings
+created by create_demo_data.py. Rows are built once at import and are read-only.
+Plain data only (no app imports), so HTTP clients like test_auth.py can use it;
+item statuses are ItemStatus member names, converted by the seeder.
+"""
+
+from types import MappingProxyType
+
+
+def _freeze(rows):
+    """Return fixture rows as an immutable tuple of read-only mappings."""
+    return tuple(MappingProxyType(row) for row in rows)
+
+
+# Demo users (passwords are hashed by the seeder)
+DEMO_USERS = _freeze([
+    {
+        "email": "demo@shelflife.ai",
+        "username": "demouser",
+        "password": "demo123",
+        "first_name": "Demo",
+        "last_name": "User",
+        "phone": "+1234567890",
+        "city": "San Francisco",
+        "state": "CA",
+        "country": "USA",
+        "latitude": 37.7749,
+        "longitude": -122.4194
+    },
+    {
+        "email": "alice@example.com",
+        "username": "alice_chef",
+        "password": "alice123",
+        "first_name": "Alice",
+        "last_name": "Smith",
+        "phone": "+1234567891",
+        "city": "San Francisco",
+        "state": "CA", 
+        "country": "USA",
+        "latitude": 37.7849,
+        "longitude": -122.4094
+    },
+    {
+        "email": "bob@example.com",
+        "username": "bob_foodie",
+        "password": "bob123",
+        "first_name": "Bob",
+        "last_name": "Johnson",
+        "phone": "+1234567892",
+        "city": "San Francisco",
+        "state": "CA",
+        "country": "USA", 
+        "latitude": 37.7649,
+        "longitude": -122.4294
+    }
+])
+
+# Demo inventory items; item i belongs to DEMO_USERS[i % len(DEMO_USERS)]
+DEMO_ITEMS = _freeze([
+    {
+        "name": "Organic Bananas",
+        "category": "Fruits",
+        "brand": "Organic Valley",
+        "quantity": 6,
+        "unit": "pieces",
+        "purchase_price": 4.99,
+        "days_until_expiry": 3,
+        "status": "NEARING"
+    },
+    {
+        "name": "Greek Yogurt",
+        "category": "Dairy",
+        "brand": "Chobani",
+        "quantity": 1,
+        "unit": "container",
+        "purchase_price": 5.99,
+        "days_until_expiry": 2,
+        "status": "NEARING"
+    },
+    {
+        "name": "Sourdough Bread", 
+        "category": "Bakery",
+        "brand": "Local Bakery",
+        "quantity": 1,
+        "unit": "loaf",
+        "purchase_price": 6.50,
+        "days_until_expiry": 1,
+        "status": "NEARING"
+    },
+    {
+        "name": "Baby Spinach",
+        "category": "Vegetables", 
+        "brand": "Organic",
+        "quantity": 1,
+        "unit": "bag",
+        "purchase_price": 3.99,
+        "days_until_expiry": 5,
+        "status": "FRESH"
+    },
+    {
+        "name": "Whole Milk",
+        "category": "Dairy",
+        "brand": "Horizon",
+        "quantity": 1,
+        "unit": "gallon",
+        "purchase_price": 4.99,
+        "days_until_expiry": 7,
+        "status": "FRESH"
+    },
+    {
+        "name": "Chicken Breast",
+        "category": "Meat",
+        "brand": "Fresh Market",
+        "quantity": 2,
+        "unit": "lbs",
+        "purchase_price": 8.99,
+        "days_until_expiry": 2,
+        "status": "NEARING"
+    }
+])
+
+# Demo marketplace listings; listing i sells item i (and has the same owner)
+DEMO_LISTINGS = _freeze([
+    {
+        "title": "Fresh Organic Bananas - Expiring Soon!",
+        "description": "6 organic bananas, perfect for smoothies or banana bread. Expiring in 2 days, great deal!",
+        "category": "Fruits",
+        "quantity": 6,
+        "unit": "pieces",
+        "price": 2.99,
+        "days_until_expiry": 2,
+        "delivery_available": True,
+        "delivery_radius_miles": 5.0
+    },
+    {
+        "title": "Greek Yogurt - Quick Sale",
+        "description": "Unopened Chobani Greek yogurt, expires tomorrow. Perfect for someone who will use it right away!",
+        "category": "Dairy", 
+        "quantity": 1,
+        "unit": "container",
+        "price": 3.99,
+        "days_until_expiry": 1,
+        "delivery_available": False,
+        "delivery_radius_miles": 0
+    },
+    {
+        "title": "Artisan Sourdough Bread",
+        "description": "Fresh sourdough from local bakery. Expires today but still perfectly good! Great for toast or bread pudding.",
+        "category": "Bakery",
+        "quantity": 1,
+        "unit": "loaf", 
+        "price": 4.00,
+        "days_until_expiry": 0,
+        "delivery_available": True,
+        "delivery_radius_miles": 3.0
+    }
+])
+
+DEMO_EMAILS = tuple(user["email"] for user in DEMO_USERS)
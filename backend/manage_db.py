@@ -17,14 +17,46 @@ Usage:
 
 import sys
 import os
+import asyncio
+import traceback
 import argparse
-import shutil
+import sqlite3
 from datetime import datetime, timedelta
 from pathlib import Path
 
 # Add the current directory to Python path
 sys.path.insert(0, os.getcwd())
 
+# Seconds restore waits for SQLite's exclusive lock before giving up
+RESTORE_LOCK_TIMEOUT = 2.0
+
+# Cleanup deletes rows in batches of this size, committing after each batch
+CLEANUP_BATCH_SIZE = 10_000
+
+# Checkpoint the SQLite WAL after this many cleanup batches
+CHECKPOINT_EVERY_BATCHES = 10
+
+# Event loop shared by every coroutine a command runs (created on first use)
+_event_loop = None
+
+def run_async(coro):
+    """Run a coroutine to completion on the shared event loop."""
+    global _event_loop
+    if _event_loop is None:
+        _event_loop = asyncio.new_event_loop()
+    return _event_loop.run_until_complete(coro)
+
+def _sqlite_backup(db_path, backup_path):
+    """Copy a live SQLite database with the Online Backup API."""
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(backup_path)
+    try:
+        with dst:
+            src.backup(dst, pages=-1)
+    finally:
+        dst.close()
+        src.close()
+
 def setup_database():
     """Setup database by creating all tables."""
     print("🏗️ Setting up ShelfLife.AI Database...")
@@ -37,15 +69,13 @@ def setup_database():
         print(f"Type: {settings.get_database_type()}")
         
         # Create tables
-        import asyncio
-        asyncio.run(create_tables())
+        run_async(create_tables())
         
         print("✅ Database setup completed successfully!")
         return True
         
     except Exception as e:
         print(f"❌ Database setup failed: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -73,10 +103,67 @@ def reset_database():
         
     except Exception as e:
         print(f"❌ Database reset failed: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
+def _read_only_engine():
+    """Engine for status queries: a separate read-only handle on SQLite, the app engine otherwise."""
+    from app.config import settings
+    from app.database import engine
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+    
+    if not settings.is_sqlite():
+        return engine
+    
+    # mode=ro never takes a write lock, and under WAL it reads alongside writers
+    # (e.g. a running backup) instead of sharing the app's single StaticPool connection
+    db_path = settings.DATABASE_URL.replace('sqlite:///', '').replace('sqlite://', '')
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    return create_engine(
+        "sqlite://",
+        creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+        poolclass=NullPool,
+    )
+
+def _get_table_counts():
+    """Return (table names, count rows or the error raised while counting)."""
+    from app.database import engine as app_engine
+    from sqlalchemy import inspect, func, literal, select, table, union_all
+    
+    engine = _read_only_engine()
+    tables = []
+    try:
+        tables = sorted(inspect(engine).get_table_names())
+        if not tables:
+            return tables, []
+        
+        # One round trip for all tables instead of one COUNT(*) per table.
+        # Built with Core so table names are quoted by the dialect and the
+        # name column is a bound parameter rather than interpolated text.
+        count_query = union_all(*(
+            select(literal(name).label('name'), func.count().label('count')).select_from(table(name))
+            for name in tables
+        ))
+        with engine.connect() as conn:
+            return tables, conn.execute(count_query).fetchall()
+    except Exception as e:
+        return tables, e
+    finally:
+        if engine is not app_engine:
+            engine.dispose()
+
+async def _probe_database():
+    """Run the health check and table counts concurrently on separate connections."""
+    from app.database import check_database_health
+    
+    # The count probe runs in a worker thread while the health check runs here
+    table_counts, health = await asyncio.gather(
+        asyncio.to_thread(_get_table_counts),
+        check_database_health(),
+    )
+    return health, table_counts
+
 def show_database_status():
     """Show database status and information."""
     print("📊 ShelfLife.AI Database Status")
@@ -84,8 +171,7 @@ def show_database_status():
     
     try:
         from app.config import settings
-        from app.database import engine, check_database_health, get_pool_status
-        from sqlalchemy import inspect, text
+        from app.database import get_pool_status
         
         # Configuration info
         config = settings.get_config_summary()
@@ -94,11 +180,11 @@ def show_database_status():
             if 'database' in key:
                 print(f"  {key}: {value}")
         
-        print(f"  Environment: {settings.ENVIRONMENT}")
+        print(f"  Environment: {config['environment']}")
+        
+        # Database health and table counts
+        health, table_counts = run_async(_probe_database())
         
-        # Database health
-        import asyncio
-        health = asyncio.run(check_database_health())
         print(f"\nDatabase Health:")
         print(f"  Status: {health['status']}")
         if 'database' in health:
@@ -108,24 +194,16 @@ def show_database_status():
         
         if health['status'] == 'healthy':
             # Table information
-            inspector = inspect(engine)
-            tables = inspector.get_table_names()
+            tables, counts = table_counts
             
             print(f"\nTables ({len(tables)}):")
-            if tables:
-                try:
-                    with engine.connect() as conn:
-                        for table in sorted(tables):
-                            try:
-                                result = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).fetchone()
-                                count = result[0] if result else 0
-                                print(f"  {table}: {count:,} records")
-                            except Exception as e:
-                                print(f"  {table}: Error getting count - {e}")
-                except Exception as e:
-                    print(f"  Could not get table counts: {e}")
-            else:
+            if isinstance(counts, Exception):
+                print(f"  Could not get table counts: {counts}")
+            elif not tables:
                 print("  No tables found")
+            else:
+                for name, count in counts:
+                    print(f"  {name}: {count:,} records")
             
             # Connection pool info
             pool_info = get_pool_status()
@@ -138,7 +216,6 @@ def show_database_status():
         
     except Exception as e:
         print(f"❌ Failed to get database status: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -166,7 +243,8 @@ def backup_database():
         print(f"  Source: {db_path}")
         print(f"  Backup: {backup_path}")
         
-        shutil.copy2(db_path, backup_path)
+        # Online Backup API: consistent page copy even while the DB is in use (WAL included)
+        _sqlite_backup(db_path, backup_path)
         
         print("✅ Database backup completed successfully!")
         print(f"💾 Backup saved to: {backup_path}")
@@ -191,20 +269,23 @@ def restore_database():
         
         # Find available backups
         db_dir = Path(db_path).parent
-        backup_files = list(db_dir.glob(f"{Path(db_path).name}.backup_*"))
+        # scandir keeps each DirEntry's stat result, so every backup is stat()ed once
+        prefix = f"{Path(db_path).name}.backup_"
+        with os.scandir(db_dir) as it:
+            backup_infos = [(e, e.stat()) for e in it if e.name.startswith(prefix) and e.is_file()]
         
-        if not backup_files:
+        if not backup_infos:
             print("❌ No backup files found")
             return False
         
         # Sort by modification time (newest first)
-        backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        backup_infos.sort(key=lambda info: info[1].st_mtime, reverse=True)
+        backup_files = [e for e, _ in backup_infos]
         
         print("📋 Available backups:")
-        for i, backup_file in enumerate(backup_files):
-            mtime = datetime.fromtimestamp(backup_file.stat().st_mtime)
-            size = backup_file.stat().st_size
-            print(f"  {i+1}. {backup_file.name} ({size:,} bytes, {mtime.strftime('%Y-%m-%d %H:%M:%S')})")
+        for i, (backup_file, st) in enumerate(backup_infos):
+            mtime = datetime.fromtimestamp(st.st_mtime)
+            print(f"  {i+1}. {backup_file.name} ({st.st_size:,} bytes, {mtime.strftime('%Y-%m-%d %H:%M:%S')})")
         
         # Get user selection
         try:
@@ -224,15 +305,36 @@ def restore_database():
             print("❌ Restore cancelled")
             return False
         
-        # Backup current database first
-        if os.path.exists(db_path):
-            current_backup = f"{db_path}.before_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            shutil.copy2(db_path, current_backup)
-            print(f"💾 Current database backed up to: {current_backup}")
+        # Release pooled connections so nothing holds the old file open during the copy
+        from app.database import engine
+        engine.dispose()
         
-        # Restore from backup
-        print(f"📋 Restoring database from {selected_backup.name}...")
-        shutil.copy2(selected_backup, db_path)
+        src = sqlite3.connect(selected_backup.path)
+        dst = sqlite3.connect(db_path, timeout=RESTORE_LOCK_TIMEOUT, isolation_level=None)
+        try:
+            # Refuse if another connection holds a SQLite lock (the backup API
+            # itself would just keep retrying until that connection lets go)
+            try:
+                dst.execute("BEGIN EXCLUSIVE")
+                dst.execute("ROLLBACK")
+            except sqlite3.OperationalError:
+                print("❌ Database is locked by another process. Stop it and try again.")
+                return False
+            
+            # Backup current database first (Online Backup API, so pending WAL pages are included)
+            if os.path.getsize(db_path) > 0:
+                current_backup = f"{db_path}.before_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                _sqlite_backup(db_path, current_backup)
+                print(f"💾 Current database backed up to: {current_backup}")
+            
+            # Restore from backup through the backup API in reverse: pages are
+            # written through SQLite's own pager and locks (WAL included), so
+            # no file is copied or unlinked underneath other connections
+            print(f"📋 Restoring database from {selected_backup.name}...")
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
         
         print("✅ Database restore completed successfully!")
         
@@ -254,46 +356,76 @@ def create_demo_data():
         
     except Exception as e:
         print(f"❌ Demo data creation failed: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
+def _delete_in_batches(db, model, cutoff, checkpoint=False):
+    """Delete rows created before cutoff in bounded batches, committing each one.
+    
+    Keeps lock hold time and WAL growth bounded on very large tables. Returns
+    the total number of rows deleted.
+    """
+    from sqlalchemy import delete, select, text
+    
+    batch_ids = select(model.id).where(model.created_at < cutoff).limit(CLEANUP_BATCH_SIZE)
+    statement = (
+        delete(model)
+        .where(model.id.in_(batch_ids))
+        .execution_options(synchronize_session=False)
+    )
+    
+    total = 0
+    batches = 0
+    while True:
+        deleted = db.execute(statement).rowcount
+        db.commit()
+        total += deleted
+        batches += 1
+        # A short batch means nothing older than cutoff is left
+        if deleted < CLEANUP_BATCH_SIZE:
+            return total
+        if checkpoint and batches % CHECKPOINT_EVERY_BATCHES == 0:
+            db.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
+            db.commit()
+
 def clean_old_data():
     """Clean up old data based on retention policies."""
     print("🧹 Cleaning up old data...")
     
     try:
         from app.config import settings
-        from app.database import SessionLocal
+        from app.database import SessionLocal, engine
         from app.models import Receipt, Message
-        from sqlalchemy import and_
-        
-        db = SessionLocal()
-        
-        # Clean up old receipts (older than 1 year)
-        cutoff_date = datetime.utcnow() - timedelta(days=365)
-        
-        old_receipts = db.query(Receipt).filter(Receipt.created_at < cutoff_date).count()
-        if old_receipts > 0:
-            db.query(Receipt).filter(Receipt.created_at < cutoff_date).delete()
-            print(f"  🗑️ Cleaned up {old_receipts} old receipts")
+        from sqlalchemy import text
         
-        # Clean up old messages (older than 6 months)
-        message_cutoff = datetime.utcnow() - timedelta(days=180)
-        old_messages = db.query(Message).filter(Message.created_at < message_cutoff).count()
-        if old_messages > 0:
-            db.query(Message).filter(Message.created_at < message_cutoff).delete()
-            print(f"  💬 Cleaned up {old_messages} old messages")
-        
-        db.commit()
-        db.close()
+        # Bulk deletes skip the ORM identity map; each batch commits on its own
+        with SessionLocal() as db:
+            checkpoint = settings.is_sqlite()
+            
+            # Clean up old receipts (older than 1 year)
+            cutoff_date = datetime.utcnow() - timedelta(days=365)
+            old_receipts = _delete_in_batches(db, Receipt, cutoff_date, checkpoint)
+            if old_receipts > 0:
+                print(f"  🗑️ Cleaned up {old_receipts} old receipts")
+            
+            # Clean up old messages (older than 6 months)
+            message_cutoff = datetime.utcnow() - timedelta(days=180)
+            old_messages = _delete_in_batches(db, Message, message_cutoff, checkpoint)
+            if old_messages > 0:
+                print(f"  💬 Cleaned up {old_messages} old messages")
+        
+        if settings.is_sqlite():
+            # Fold the WAL back into the DB without blocking readers, and refresh
+            # planner statistics that the bulk deletes just made stale
+            with engine.connect() as conn:
+                conn.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
+                conn.execute(text("PRAGMA optimize"))
         
         print("✅ Data cleanup completed!")
         return True
         
     except Exception as e:
         print(f"❌ Data cleanup failed: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -334,9 +466,11 @@ def main():
         sys.exit(1)
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if _event_loop is not None:
+            _event_loop.close()
 
 if __name__ == "__main__":
     main()
@@ -7,6 +7,7 @@ This script drops all existing tables and recreates them with the correct schema
 
 import sys
 import os
+import traceback
 
 # Add the current directory to Python path
 sys.path.insert(0, os.getcwd())
@@ -17,18 +18,13 @@ def reset_database():
     
     try:
         from app.config import settings
-        from app.database import engine, Base
+        from app.database import reset_database as db_reset
         
         print(f"📍 Database URL: {settings.DATABASE_URL}")
         
-        # Drop all existing tables
-        print("🗑️ Dropping existing tables...")
-        Base.metadata.drop_all(bind=engine)
-        print("✅ Existing tables dropped")
-        
-        # Create all tables with new schema
-        print("🏗️ Creating tables with new schema...")
-        Base.metadata.create_all(bind=engine)
+        # Same drop/recreate path as `manage_db.py reset`
+        print("🗑️ Dropping existing tables and creating them with the new schema...")
+        db_reset()
         print("✅ All tables created successfully")
         
         print("\n🎉 Database reset completed successfully!")
@@ -36,7 +32,6 @@ def reset_database():
         
     except Exception as e:
         print(f"❌ Database reset failed: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
@@ -3,19 +3,60 @@
 """
 Authentication Test Script for ShelfLife.AI
 Tests login/logout functionality and token management.
+
+Usage:
+    python test_auth.py                       # Full report against a running API
+    python test_auth.py --test-refresh-chain  # Also log out with a refreshed token
+    pytest tests/test_auth_flows.py           # Per-user flows as pytest cases
 """
 
 import sys
-import os
+import argparse
 import requests
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
-# Add the current directory to Python path
-sys.path.insert(0, os.getcwd())
+import demo_fixtures
 
 API_BASE = "http://localhost:8000"
 
+# (connect, read) timeouts: fail fast when the server is down, never hang on a stalled one
+HEALTH_TIMEOUT = (0.5, 3.0)
+REQUEST_TIMEOUT = (1.0, 10.0)
+
+# Health probes before giving up (backoff 0.25s, 0.5s between them)
+HEALTH_ATTEMPTS = 3
+
+# Demo user credentials as (email, password), from the fixtures the seeder uses
+DEMO_USERS = tuple((user["email"], user["password"]) for user in demo_fixtures.DEMO_USERS)
+
+def encode_login(email, password):
+    """Serialize a login request body."""
+    return json.dumps({"email": email, "password": password}).encode("utf-8")
+
+# Login request bodies, serialized once up front (Content-Type comes from the session)
+DEMO_LOGIN_BODIES = {email: encode_login(email, password) for email, password in DEMO_USERS}
+INVALID_LOGIN_BODY = encode_login("invalid@example.com", "wrongpassword")
+
+class BearerAuth(requests.auth.AuthBase):
+    """Attach a bearer token to a single request."""
+    
+    def __init__(self, token):
+        self.token = token
+    
+    def __call__(self, request):
+        request.headers["Authorization"] = "Bearer " + self.token
+        return request
+
+# One pooled session for every request so connections are kept alive between calls
+SESSION = requests.Session()
+SESSION.headers.update({"Content-Type": "application/json"})
+for prefix in ("http://", "https://"):
+    SESSION.mount(prefix, HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 class Colors:
     RED = '\033[0;31m'
     GREEN = '\033[0;32m'
@@ -23,47 +64,56 @@ class Colors:
     BLUE = '\033[0;34m'
     NC = '\033[0m'  # No Color
 
+# Escape codes are just noise in CI logs, so drop them when stdout isn't a terminal
+if not sys.stdout.isatty():
+    Colors.RED = Colors.GREEN = Colors.YELLOW = Colors.BLUE = Colors.NC = ""
+
+# Per-thread output buffer, so concurrent user flows don't interleave their logs
+_output = threading.local()
+
+def emit(line):
+    """Print a line, or buffer it when running inside a user flow thread."""
+    buffer = getattr(_output, "lines", None)
+    if buffer is None:
+        print(line)
+    else:
+        buffer.append(line)
+
 def log(message):
-    print(f"{Colors.BLUE}[TEST]{Colors.NC} {message}")
+    emit(f"{Colors.BLUE}[TEST]{Colors.NC} {message}")
 
 def success(message):
-    print(f"{Colors.GREEN}✅ {message}{Colors.NC}")
+    emit(f"{Colors.GREEN}✅ {message}{Colors.NC}")
 
 def warning(message):
-    print(f"{Colors.YELLOW}⚠️  {message}{Colors.NC}")
+    emit(f"{Colors.YELLOW}⚠️  {message}{Colors.NC}")
 
 def error(message):
-    print(f"{Colors.RED}❌ {message}{Colors.NC}")
+    emit(f"{Colors.RED}❌ {message}{Colors.NC}")
 
-def test_api_health():
-    """Test if API is running."""
-    try:
-        response = requests.get(f"{API_BASE}/health", timeout=5)
-        if response.status_code == 200:
-            success("API is running")
-            return True
-        else:
-            error(f"API health check failed: {response.status_code}")
-            return False
-    except requests.RequestException as e:
-        error(f"Cannot connect to API: {e}")
-        return False
+def test_api_health(attempts=HEALTH_ATTEMPTS):
+    """Test if API is running, retrying with backoff while it starts up."""
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(0.25 * 2 ** (attempt - 1))
+        try:
+            response = SESSION.get(f"{API_BASE}/health", timeout=HEALTH_TIMEOUT)
+            if response.status_code == 200:
+                success("API is running")
+                return True
+            problem = f"API health check failed: {response.status_code}"
+        except requests.RequestException as e:
+            problem = f"Cannot connect to API: {e}"
+    
+    error(problem)
+    return False
 
-def test_login(email, password):
-    """Test user login."""
+def test_login(email, body):
+    """Test user login with a pre-encoded request body."""
     log(f"Testing login for {email}")
     
     try:
-        login_data = {
-            "email": email,
-            "password": password
-        }
-        
-        response = requests.post(
-            f"{API_BASE}/api/auth/login", 
-            json=login_data,
-            headers={"Content-Type": "application/json"}
-        )
+        response = SESSION.post(f"{API_BASE}/api/auth/login", data=body, timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 200:
             token_data = response.json()
@@ -88,9 +138,9 @@ def test_login(email, password):
             error(f"Login failed for {email}: {response.status_code}")
             try:
                 error_detail = response.json()
-                print(f"    Error: {error_detail}")
+                emit(f"    Error: {error_detail}")
             except:
-                print(f"    Response: {response.text}")
+                emit(f"    Response: {response.text}")
             return None
             
     except requests.RequestException as e:
@@ -102,12 +152,7 @@ def test_protected_endpoint(access_token):
     log("Testing protected endpoint (/api/auth/me)")
     
     try:
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(f"{API_BASE}/api/auth/me", headers=headers)
+        response = SESSION.get(f"{API_BASE}/api/auth/me", auth=BearerAuth(access_token), timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 200:
             user_data = response.json()
@@ -119,9 +164,9 @@ def test_protected_endpoint(access_token):
             error(f"Protected endpoint access failed: {response.status_code}")
             try:
                 error_detail = response.json()
-                print(f"    Error: {error_detail}")
+                emit(f"    Error: {error_detail}")
             except:
-                print(f"    Response: {response.text}")
+                emit(f"    Response: {response.text}")
             return False
             
     except requests.RequestException as e:
@@ -133,12 +178,7 @@ def test_logout(access_token):
     log("Testing logout")
     
     try:
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(f"{API_BASE}/api/auth/logout", headers=headers)
+        response = SESSION.post(f"{API_BASE}/api/auth/logout", auth=BearerAuth(access_token), timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 200:
             result = response.json()
@@ -149,9 +189,9 @@ def test_logout(access_token):
             error(f"Logout failed: {response.status_code}")
             try:
                 error_detail = response.json()
-                print(f"    Error: {error_detail}")
+                emit(f"    Error: {error_detail}")
             except:
-                print(f"    Response: {response.text}")
+                emit(f"    Response: {response.text}")
             return False
             
     except requests.RequestException as e:
@@ -163,12 +203,7 @@ def test_token_after_logout(access_token):
     log("Testing token validity after logout")
     
     try:
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(f"{API_BASE}/api/auth/me", headers=headers)
+        response = SESSION.get(f"{API_BASE}/api/auth/me", auth=BearerAuth(access_token), timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 401:
             success("Token correctly invalidated after logout")
@@ -186,16 +221,7 @@ def test_invalid_credentials():
     log("Testing login with invalid credentials")
     
     try:
-        login_data = {
-            "email": "invalid@example.com",
-            "password": "wrongpassword"
-        }
-        
-        response = requests.post(
-            f"{API_BASE}/api/auth/login", 
-            json=login_data,
-            headers={"Content-Type": "application/json"}
-        )
+        response = SESSION.post(f"{API_BASE}/api/auth/login", data=INVALID_LOGIN_BODY, timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 401:
             success("Invalid credentials correctly rejected")
@@ -217,12 +243,7 @@ def test_refresh_token(refresh_token):
         return False
     
     try:
-        headers = {
-            "Authorization": f"Bearer {refresh_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(f"{API_BASE}/api/auth/refresh", headers=headers)
+        response = SESSION.post(f"{API_BASE}/api/auth/refresh", auth=BearerAuth(refresh_token), timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 200:
             token_data = response.json()
@@ -233,16 +254,95 @@ def test_refresh_token(refresh_token):
             error(f"Refresh token failed: {response.status_code}")
             try:
                 error_detail = response.json()
-                print(f"    Error: {error_detail}")
+                emit(f"    Error: {error_detail}")
             except:
-                print(f"    Response: {response.text}")
+                emit(f"    Response: {response.text}")
             return None
             
     except requests.RequestException as e:
         error(f"Refresh token request failed: {e}")
         return None
 
-def run_authentication_tests():
+def buffered(flow, *args):
+    """Run a flow with its output buffered; returns (output lines, test results).
+    
+    Buffering lets flows run concurrently and still print one block at a time.
+    """
+    _output.lines = []
+    try:
+        results = flow(*args)
+    finally:
+        lines, _output.lines = _output.lines, None
+    return lines, results
+
+def run_user_flow(email):
+    """Run the login/logout flow for one demo user."""
+    results = []
+    
+    emit(f"\n{Colors.YELLOW}Testing user: {email}{Colors.NC}")
+    
+    # Test login
+    token_data = test_login(email, DEMO_LOGIN_BODIES[email])
+    if token_data:
+        results.append((f"Login {email}", True))
+        
+        access_token = token_data.get("access_token")
+        
+        if access_token:
+            # Test protected endpoint
+            if test_protected_endpoint(access_token):
+                results.append((f"Protected Access {email}", True))
+            else:
+                results.append((f"Protected Access {email}", False))
+            
+            # Test logout with the token from login
+            if test_logout(access_token):
+                results.append((f"Logout {email}", True))
+                
+                # Test token invalidation
+                if test_token_after_logout(access_token):
+                    results.append((f"Token Invalidation {email}", True))
+                else:
+                    results.append((f"Token Invalidation {email}", False))
+            else:
+                results.append((f"Logout {email}", False))
+        else:
+            error("No access token received")
+            results.append((f"Login {email}", False))
+    else:
+        results.append((f"Login {email}", False))
+    
+    return results
+
+def run_refresh_flow(email, test_chain=False):
+    """Test the refresh token once; with test_chain, also log out with the refreshed token."""
+    results = []
+    
+    emit(f"\n{Colors.YELLOW}Testing refresh token: {email}{Colors.NC}")
+    
+    token_data = test_login(email, DEMO_LOGIN_BODIES[email])
+    refresh_token = token_data.get("refresh_token") if token_data else None
+    if not refresh_token:
+        warning("No refresh token received, skipping refresh test")
+        return results
+    
+    new_token_data = test_refresh_token(refresh_token)
+    results.append(("Refresh Token", bool(new_token_data)))
+    
+    if new_token_data and test_chain:
+        access_token = new_token_data.get("access_token")
+        logged_out = test_logout(access_token)
+        results.append(("Logout (refreshed token)", logged_out))
+        if logged_out:
+            results.append(("Token Invalidation (refreshed token)", test_token_after_logout(access_token)))
+    
+    return results
+
+def run_user_and_refresh_flow(email, test_chain=False):
+    """Run the user flow, then the refresh token check for the same user."""
+    return run_user_flow(email) + run_refresh_flow(email, test_chain)
+
+def run_authentication_tests(test_refresh_chain=False):
     """Run comprehensive authentication tests."""
     print(f"{Colors.BLUE}")
     print("🔐 ShelfLife.AI Authentication Tests")
@@ -252,64 +352,26 @@ def run_authentication_tests():
     test_results = []
     
     # Test API health
+    # Stop before any user flow runs; an unhealthy API would only fail every request
     if not test_api_health():
         error("API is not running. Please start the server first.")
-        return False
+        sys.exit(2)
     
     test_results.append(("API Health", True))
     
-    # Demo user credentials
-    demo_users = [
-        {"email": "demo@shelflife.ai", "password": "demo123"},
-        {"email": "alice@example.com", "password": "alice123"},
-        {"email": "bob@example.com", "password": "bob123"}
-    ]
+    demo_emails = [email for email, _ in DEMO_USERS]
     
-    # Test each demo user
-    for user in demo_users:
-        print(f"\n{Colors.YELLOW}Testing user: {user['email']}{Colors.NC}")
-        
-        # Test login
-        token_data = test_login(user["email"], user["password"])
-        if token_data:
-            test_results.append((f"Login {user['email']}", True))
-            
-            access_token = token_data.get("access_token")
-            refresh_token = token_data.get("refresh_token")
-            
-            if access_token:
-                # Test protected endpoint
-                if test_protected_endpoint(access_token):
-                    test_results.append((f"Protected Access {user['email']}", True))
-                else:
-                    test_results.append((f"Protected Access {user['email']}", False))
-                
-                # Test refresh token if available
-                if refresh_token:
-                    new_token_data = test_refresh_token(refresh_token)
-                    if new_token_data:
-                        test_results.append((f"Refresh Token {user['email']}", True))
-                        # Use new token for logout test
-                        access_token = new_token_data.get("access_token", access_token)
-                    else:
-                        test_results.append((f"Refresh Token {user['email']}", False))
-                
-                # Test logout
-                if test_logout(access_token):
-                    test_results.append((f"Logout {user['email']}", True))
-                    
-                    # Test token invalidation
-                    if test_token_after_logout(access_token):
-                        test_results.append((f"Token Invalidation {user['email']}", True))
-                    else:
-                        test_results.append((f"Token Invalidation {user['email']}", False))
-                else:
-                    test_results.append((f"Logout {user['email']}", False))
-            else:
-                error("No access token received")
-                test_results.append((f"Login {user['email']}", False))
-        else:
-            test_results.append((f"Login {user['email']}", False))
+    # Each user's flow is independent and I/O bound, so run them concurrently.
+    # The single refresh-token check reuses the first user, so it runs after that
+    # user's own flow rather than racing it (the backend may rotate refresh tokens)
+    with ThreadPoolExecutor(max_workers=len(demo_emails)) as executor:
+        flows = [executor.submit(buffered, run_user_and_refresh_flow, demo_emails[0], test_refresh_chain)]
+        flows += [executor.submit(buffered, run_user_flow, email) for email in demo_emails[1:]]
+        flows = [future.result() for future in flows]
+    
+    for lines, results in flows:
+        print("\n".join(lines))
+        test_results.extend(results)
     
     # Test invalid credentials
     print(f"\n{Colors.YELLOW}Testing invalid credentials{Colors.NC}")
@@ -318,9 +380,8 @@ def run_authentication_tests():
     else:
         test_results.append(("Invalid Credentials", False))
     
-    # Summary
-    print(f"\n{Colors.BLUE}Test Results Summary{Colors.NC}")
-    print("=" * 40)
+    # Summary, written as one block (a single write even on a line-buffered terminal)
+    summary = [f"\n{Colors.BLUE}Test Results Summary{Colors.NC}", "=" * 40]
     
     passed = 0
     total = len(test_results)
@@ -328,11 +389,12 @@ def run_authentication_tests():
     for test_name, result in test_results:
         status = "✅ PASS" if result else "❌ FAIL"
         color = Colors.GREEN if result else Colors.RED
-        print(f"{color}{status}{Colors.NC} {test_name}")
+        summary.append(f"{color}{status}{Colors.NC} {test_name}")
         if result:
             passed += 1
     
-    print(f"\nResults: {passed}/{total} tests passed")
+    summary.append(f"\nResults: {passed}/{total} tests passed")
+    print("\n".join(summary))
     
     if passed == total:
         print(f"\n{Colors.GREEN}🎉 All authentication tests passed!{Colors.NC}")
@@ -350,8 +412,18 @@ def run_authentication_tests():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ShelfLife.AI authentication tests")
+    parser.add_argument(
+        '--test-refresh-chain',
+        action='store_true',
+        help='Also log out with the refreshed access token and check it is invalidated'
+    )
+    args = parser.parse_args()
+    
     try:
-        success = run_authentication_tests()
+        # Close pooled connections once the run finishes
+        with SESSION:
+            success = run_authentication_tests(test_refresh_chain=args.test_refresh_chain)
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Tests cancelled by user{Colors.NC}")
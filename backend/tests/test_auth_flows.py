@@ -0,0 +1,20 @@
+import pytest
+
+import test_auth as auth
+
+
+@pytest.fixture(scope="session")
+def api_session():
+    """Shared HTTP session; skips the pytest run when the API is not up."""
+    if not auth.test_api_health():
+        pytest.skip("API is not running")
+    return auth.SESSION
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("email", [email for email, _ in auth.DEMO_USERS])
+def test_demo_user_flow(api_session, email):
+    """Login/logout flow, as one pytest case per demo user."""
+    lines, results = auth.buffered(auth.run_user_flow, email)
+    failed = [name for name, passed in results if not passed]
+    assert not failed, "\n".join(lines)
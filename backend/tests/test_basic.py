@@ -30,8 +30,11 @@ def test_environment():
 def test_python_path():
     """Test Python path configuration"""
     current_dir = os.getcwd()
-    assert current_dir in sys.path or any(current_dir in p for p in sys.path), \
-        "Current directory not in Python path"
+    if current_dir not in sys.path:
+        # Only resolve entries ('' and relative paths) when the direct lookup misses
+        real_dir = os.path.realpath(current_dir)
+        assert any(os.path.realpath(p).startswith(real_dir) for p in sys.path), \
+            "Current directory not in Python path"
     print(f"✅ Python path includes: {current_dir}")
 
 if __name__ == "__main__":
@@ -1,41 +1,72 @@
 import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime, timedelta
-import uuid
 
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
 from app.services.inventory_service import InventoryService
 from app.models import InventoryItem, ItemStatus, ItemSource
 from app.schemas import InventoryItemCreate, InventoryItemUpdate, InventoryFilter
 
 
+@pytest.fixture
+def inventory_service(mock_db):
+    """InventoryService bound to a fresh mock session."""
+    return InventoryService(mock_db)
+
+
+@pytest.fixture
+def sample_item(sample_user_id, sample_item_id):
+    """Sample inventory item."""
+    now = datetime.utcnow()
+    return InventoryItem(
+        id=sample_item_id,
+        user_id=sample_user_id,
+        name="Test Milk",
+        category="Dairy",
+        brand="TestBrand",
+        quantity=1,
+        unit="liter",
+        purchase_price=3.99,
+        purchase_date=now,
+        predicted_expiry_date=now + timedelta(days=7),
+        status=ItemStatus.FRESH,
+        source=ItemSource.RECEIPT,
+        created_at=now,
+        last_updated=now
+    )
+
+
+@pytest.fixture
+def sqlite_db():
+    """Real session on a throwaway in-memory SQLite database."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def mock_db_with_item(mock_db, sample_item):
+    """Mock session whose item lookup finds sample_item."""
+    mock_db.query.return_value.filter.return_value.first.return_value = sample_item
+    return mock_db
+
+
+@pytest.fixture
+def mock_db_with_none(mock_db):
+    """Mock session whose item lookup finds nothing."""
+    mock_db.query.return_value.filter.return_value.first.return_value = None
+    return mock_db
+
+
 class TestInventoryService:
     
-    def setup_method(self):
-        """Setup test fixtures before each test method."""
-        self.mock_db = Mock()
-        self.inventory_service = InventoryService(self.mock_db)
-        self.user_id = str(uuid.uuid4())
-        self.item_id = str(uuid.uuid4())
-        
-        # Sample inventory item
-        self.sample_item = InventoryItem(
-            id=self.item_id,
-            user_id=self.user_id,
-            name="Test Milk",
-            category="Dairy",
-            brand="TestBrand",
-            quantity=1,
-            unit="liter",
-            purchase_price=3.99,
-            purchase_date=datetime.utcnow(),
-            predicted_expiry_date=datetime.utcnow() + timedelta(days=7),
-            status=ItemStatus.FRESH,
-            source=ItemSource.RECEIPT,
-            created_at=datetime.utcnow(),
-            last_updated=datetime.utcnow()
-        )
-
-    def test_create_inventory_item(self):
+    def test_create_inventory_item(self, inventory_service, mock_db, sample_user_id):
         """Test creating a new inventory item."""
         # Arrange
         item_data = InventoryItemCreate(
@@ -48,52 +79,40 @@ class TestInventoryService:
             source=ItemSource.MANUAL
         )
         
-        self.mock_db.add = Mock()
-        self.mock_db.commit = Mock()
-        self.mock_db.refresh = Mock()
-        
         # Act
-        result = self.inventory_service.create_inventory_item(self.user_id, item_data)
+        result = inventory_service.create_inventory_item(sample_user_id, item_data)
         
         # Assert
         assert result.name == "Test Item"
-        assert result.user_id == self.user_id
+        assert result.user_id == sample_user_id
         assert result.category == "Test Category"
         assert result.status == ItemStatus.FRESH
-        self.mock_db.add.assert_called_once()
-        self.mock_db.commit.assert_called_once()
-        self.mock_db.refresh.assert_called_once()
+        mock_db.add.assert_called_once()
+        mock_db.commit.assert_called_once()
+        mock_db.refresh.assert_called_once()
 
-    def test_get_inventory_item(self):
+    def test_get_inventory_item(self, inventory_service, mock_db_with_item, sample_item, sample_user_id, sample_item_id):
         """Test retrieving a specific inventory item."""
-        # Arrange
-        self.mock_db.query.return_value.filter.return_value.first.return_value = self.sample_item
-        
         # Act
-        result = self.inventory_service.get_inventory_item(self.item_id, self.user_id)
+        result = inventory_service.get_inventory_item(sample_item_id, sample_user_id)
         
         # Assert
-        assert result == self.sample_item
+        assert result == sample_item
         assert result.name == "Test Milk"
-        assert result.id == self.item_id
+        assert result.id == sample_item_id
         
-    def test_get_inventory_item_not_found(self):
+    def test_get_inventory_item_not_found(self, inventory_service, mock_db_with_none, sample_user_id):
         """Test retrieving a non-existent inventory item."""
-        # Arrange
-        self.mock_db.query.return_value.filter.return_value.first.return_value = None
-        
         # Act
-        result = self.inventory_service.get_inventory_item("non-existent-id", self.user_id)
+        result = inventory_service.get_inventory_item("non-existent-id", sample_user_id)
         
         # Assert
         assert result is None
 
-    def test_update_inventory_item(self):
+    def test_update_inventory_item(self, inventory_service, mock_db_with_item, sample_item, sample_user_id, sample_item_id):
         """Test updating an inventory item."""
         # Arrange
-        self.mock_db.query.return_value.filter.return_value.first.return_value = self.sample_item
-        self.mock_db.commit = Mock()
-        self.mock_db.refresh = Mock(return_value=self.sample_item)
+        mock_db_with_item.refresh.return_value = sample_item
         
         update_data = InventoryItemUpdate(
             name="Updated Milk",
@@ -102,54 +121,46 @@ class TestInventoryService:
         )
         
         # Act
-        result = self.inventory_service.update_inventory_item(
-            self.item_id, 
-            self.user_id, 
+        result = inventory_service.update_inventory_item(
+            sample_item_id, 
+            sample_user_id, 
             update_data
         )
         
         # Assert
         assert result is not None
-        self.mock_db.commit.assert_called_once()
-        self.mock_db.refresh.assert_called_once()
+        mock_db_with_item.commit.assert_called_once()
+        mock_db_with_item.refresh.assert_called_once()
 
-    def test_delete_inventory_item(self):
+    def test_delete_inventory_item(self, inventory_service, mock_db_with_item, sample_item, sample_user_id, sample_item_id):
         """Test deleting an inventory item."""
-        # Arrange
-        self.mock_db.query.return_value.filter.return_value.first.return_value = self.sample_item
-        self.mock_db.delete = Mock()
-        self.mock_db.commit = Mock()
-        
         # Act
-        result = self.inventory_service.delete_inventory_item(self.item_id, self.user_id)
+        result = inventory_service.delete_inventory_item(sample_item_id, sample_user_id)
         
         # Assert
         assert result is True
-        self.mock_db.delete.assert_called_once_with(self.sample_item)
-        self.mock_db.commit.assert_called_once()
+        mock_db_with_item.delete.assert_called_once_with(sample_item)
+        mock_db_with_item.commit.assert_called_once()
 
-    def test_delete_inventory_item_not_found(self):
+    def test_delete_inventory_item_not_found(self, inventory_service, mock_db_with_none, sample_user_id):
         """Test deleting a non-existent inventory item."""
-        # Arrange
-        self.mock_db.query.return_value.filter.return_value.first.return_value = None
-        
         # Act
-        result = self.inventory_service.delete_inventory_item("non-existent-id", self.user_id)
+        result = inventory_service.delete_inventory_item("non-existent-id", sample_user_id)
         
         # Assert
         assert result is False
 
-    def test_get_user_inventory_with_filter(self):
+    def test_get_user_inventory_with_filter(self, inventory_service, mock_db, sample_item, sample_user_id):
         """Test getting user inventory with filters."""
         # Arrange
-        mock_items = [self.sample_item]
+        mock_items = [sample_item]
         mock_query = Mock()
         mock_query.filter.return_value = mock_query
         mock_query.order_by.return_value = mock_query
         mock_query.offset.return_value = mock_query
         mock_query.limit.return_value.all.return_value = mock_items
         
-        self.mock_db.query.return_value = mock_query
+        mock_db.query.return_value = mock_query
         
         filters = InventoryFilter(
             status=ItemStatus.FRESH,
@@ -158,8 +169,8 @@ class TestInventoryService:
         )
         
         # Act
-        result = self.inventory_service.get_user_inventory(
-            self.user_id, 
+        result = inventory_service.get_user_inventory(
+            sample_user_id, 
             skip=0, 
             limit=10, 
             filters=filters
@@ -169,40 +180,63 @@ class TestInventoryService:
         assert len(result) == 1
         assert result[0].name == "Test Milk"
 
-    def test_mark_item_as_used(self):
+    def test_mark_item_as_used(self, inventory_service, mock_db_with_item, sample_item, sample_user_id, sample_item_id):
         """Test marking an item as used."""
         # Arrange
-        self.mock_db.query.return_value.filter.return_value.first.return_value = self.sample_item
-        self.mock_db.commit = Mock()
-        self.mock_db.refresh = Mock(return_value=self.sample_item)
+        mock_db_with_item.refresh.return_value = sample_item
         
         # Act
-        result = self.inventory_service.mark_item_as_used(self.item_id, self.user_id)
+        result = inventory_service.mark_item_as_used(sample_item_id, sample_user_id)
         
         # Assert
         assert result is not None
-        self.mock_db.commit.assert_called_once()
+        mock_db_with_item.commit.assert_called_once()
 
     @patch('app.services.inventory_service.datetime')
-    def test_update_item_statuses(self, mock_datetime):
+    def test_update_item_statuses(self, mock_datetime, inventory_service, mock_db):
         """Test updating item statuses based on expiry dates."""
         # Arrange
         now = datetime.utcnow()
         mock_datetime.utcnow.return_value = now
         
         mock_query = Mock()
-        self.mock_db.query.return_value = mock_query
+        mock_db.query.return_value = mock_query
         mock_query.filter.return_value = mock_query
-        mock_query.update = Mock()
-        self.mock_db.commit = Mock()
         
         # Act
-        self.inventory_service.update_item_statuses()
+        inventory_service.update_item_statuses()
+        
+        # Assert
+        mock_db.commit.assert_called_once()
+        # Expired and nearing transitions are applied in a single CASE update
+        assert mock_query.update.call_count == 1
+
+    def test_update_item_statuses_transitions(self, sqlite_db, sample_user_id):
+        """Test the status each item ends up with after the bulk update."""
+        # Arrange
+        now = datetime.utcnow()
+        cases = {
+            "fresh_expired": (ItemStatus.FRESH, now - timedelta(days=1), ItemStatus.EXPIRED),
+            "fresh_nearing": (ItemStatus.FRESH, now + timedelta(days=2), ItemStatus.NEARING),
+            "fresh_later": (ItemStatus.FRESH, now + timedelta(days=10), ItemStatus.FRESH),
+            "nearing_expired": (ItemStatus.NEARING, now - timedelta(days=1), ItemStatus.NEARING),
+        }
+        for name, (status, expiry, _) in cases.items():
+            sqlite_db.add(InventoryItem(
+                user_id=sample_user_id,
+                name=name,
+                predicted_expiry_date=expiry,
+                status=status
+            ))
+        sqlite_db.commit()
+        
+        # Act
+        InventoryService(sqlite_db).update_item_statuses()
         
         # Assert
-        self.mock_db.commit.assert_called_once()
-        # Should be called twice - once for expired items, once for nearing items
-        assert mock_query.update.call_count == 2
+        sqlite_db.expire_all()
+        statuses = {item.name: item.status for item in sqlite_db.query(InventoryItem)}
+        assert statuses == {name: expected for name, (_, _, expected) in cases.items()}
 
 
 if __name__ == "__main__":
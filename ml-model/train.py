@@ -6,143 +6,284 @@ Trains a machine learning model to predict food expiry dates.
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import lightgbm as lgb
 import joblib
+from threadpoolctl import threadpool_limits
 import os
 import json
 from datetime import datetime, timedelta
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_synthetic_training_data(n_samples: int = 10000) -> pd.DataFrame:
-    """Generate synthetic training data for the ML model."""
-    np.random.seed(42)
-    
-    # Define categories and their typical shelf lives
-    categories = {
-        'dairy': {'mean': 10, 'std': 5, 'min': 1, 'max': 30},
-        'meat': {'mean': 3, 'std': 2, 'min': 1, 'max': 10},
-        'vegetables': {'mean': 7, 'std': 4, 'min': 1, 'max': 21},
-        'fruits': {'mean': 8, 'std': 5, 'min': 2, 'max': 30},
-        'bakery': {'mean': 5, 'std': 3, 'min': 1, 'max': 14},
-        'pantry': {'mean': 180, 'std': 100, 'min': 30, 'max': 730}
-    }
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+# joblib.dump settings for saved artifacts: zlib level 3 (readable by any joblib
+# install, unlike lz4) and pickle protocol 5
+MODEL_COMPRESS = 3
+PICKLE_PROTOCOL = 5
+
+# Model inputs, in column order
+FEATURE_COLUMNS = ['category', 'storage_location', 'brand_type', 'is_organic',
+                   'purchase_season', 'temperature_avg']
+
+# Label-encoded columns; LightGBM is told to treat these as categorical.
+# Training runs on plain arrays, so LightGBM gets their column positions.
+CATEGORICAL_FEATURES = ['category', 'storage_location', 'brand_type']
+CATEGORICAL_INDICES = [FEATURE_COLUMNS.index(f) for f in CATEGORICAL_FEATURES]
+
+# Synthetic data parameters, as parallel arrays indexed by the sampled codes.
+# Categories and their typical shelf lives in days
+_CAT_NAMES = np.array(['dairy', 'meat', 'vegetables', 'fruits', 'bakery', 'pantry'])
+_CAT_MEAN = np.array([10, 3, 7, 8, 5, 180], dtype=np.float64)
+_CAT_STD = np.array([5, 2, 4, 5, 3, 100], dtype=np.float64)
+_CAT_MIN = np.array([1, 1, 1, 2, 1, 30], dtype=np.float64)
+_CAT_MAX = np.array([30, 10, 21, 30, 14, 730], dtype=np.float64)
+
+_STORAGE_NAMES = np.array(['pantry', 'refrigerator', 'freezer'])
+_STORAGE_MULT = np.array([1.0, 1.5, 10.0])
+
+_BRAND_NAMES = np.array(['generic', 'premium', 'organic', 'store_brand', 'name_brand'])
+_BRAND_MULT = np.array([1.0, 1.2, 0.8, 0.9, 1.1])
+_BRAND_ORGANIC = np.array([0, 0, 1, 0, 0], dtype=np.int8)
+
+def generate_synthetic_training_data(n_samples: int = 10000, seed=42) -> pd.DataFrame:
+    """Generate synthetic training data for the ML model.
     
-    storage_multipliers = {
-        'pantry': 1.0,
-        'refrigerator': 1.5,
-        'freezer': 10.0
-    }
+    All samples are drawn in one vectorized pass: each categorical column is
+    an index array, and per-category parameters are looked up by fancy indexing
+    into the module-level tables. seed is an int or an existing
+    np.random.Generator (reused as-is, so successive calls continue its stream);
+    the global np.random state is never touched.
+    """
+    rng = np.random.default_rng(seed)
     
-    brands = ['generic', 'premium', 'organic', 'store_brand', 'name_brand']
-    brand_multipliers = {'organic': 0.8, 'premium': 1.2, 'generic': 1.0, 'store_brand': 0.9, 'name_brand': 1.1}
+    category_idx = rng.integers(0, len(_CAT_NAMES), n_samples)
+    storage_idx = rng.integers(0, len(_STORAGE_NAMES), n_samples)
+    brand_idx = rng.integers(0, len(_BRAND_NAMES), n_samples)
     
-    data = []
+    # Shelf life is computed in place in one preallocated buffer (plus one for
+    # the noise) instead of allocating a temporary per arithmetic step.
+    # loc + scale * z draws the same stream as rng.normal(loc, scale).
+    shelf_life = np.empty(n_samples)
+    noise = np.empty(n_samples)
     
-    for _ in range(n_samples):
-        category = np.random.choice(list(categories.keys()))
-        storage = np.random.choice(list(storage_multipliers.keys()))
-        brand = np.random.choice(brands)
-        
-        # Base shelf life from category
-        base_shelf_life = max(
-            categories[category]['min'],
-            min(
-                categories[category]['max'],
-                np.random.normal(categories[category]['mean'], categories[category]['std'])
-            )
-        )
-        
-        # Apply modifiers
-        shelf_life = base_shelf_life * storage_multipliers[storage] * brand_multipliers[brand]
-        
-        # Add some noise
-        shelf_life = max(1, shelf_life + np.random.normal(0, shelf_life * 0.1))
-        
-        # Additional features
-        is_organic = 1 if 'organic' in brand else 0
-        purchase_season = np.random.randint(1, 5)  # 1=spring, 2=summer, 3=fall, 4=winter
-        temperature_avg = np.random.normal(20, 10)  # Average storage temperature
-        
-        data.append({
-            'category': category,
-            'storage_location': storage,
-            'brand_type': brand,
-            'is_organic': is_organic,
-            'purchase_season': purchase_season,
-            'temperature_avg': temperature_avg,
-            'shelf_life_days': int(shelf_life)
-        })
-    
-    return pd.DataFrame(data)
+    # Base shelf life from category
+    rng.standard_normal(out=shelf_life)
+    shelf_life *= _CAT_STD[category_idx]
+    shelf_life += _CAT_MEAN[category_idx]
+    np.clip(shelf_life, _CAT_MIN[category_idx], _CAT_MAX[category_idx], out=shelf_life)
+    
+    # Apply modifiers
+    shelf_life *= _STORAGE_MULT[storage_idx]
+    shelf_life *= _BRAND_MULT[brand_idx]
+    
+    # Add some noise: shelf_life + N(0, 0.1 * shelf_life) == shelf_life * (1 + 0.1 * z)
+    rng.standard_normal(out=noise)
+    noise *= 0.1
+    noise += 1
+    shelf_life *= noise
+    np.maximum(shelf_life, 1, out=shelf_life)
+    
+    return pd.DataFrame({
+        'category': _CAT_NAMES[category_idx],
+        'storage_location': _STORAGE_NAMES[storage_idx],
+        'brand_type': _BRAND_NAMES[brand_idx],
+        'is_organic': _BRAND_ORGANIC[brand_idx],
+        'purchase_season': rng.integers(1, 5, n_samples),  # 1=spring, 2=summer, 3=fall, 4=winter
+        'temperature_avg': rng.normal(20, 10, n_samples),  # Average storage temperature
+        'shelf_life_days': shelf_life.astype(np.int32)
+    })
 
 def prepare_features(df: pd.DataFrame) -> tuple:
-    """Prepare features for training."""
-    # Encode categorical variables
-    label_encoders = {}
-    categorical_features = ['category', 'storage_location', 'brand_type']
+    """Prepare features for training.
     
-    df_encoded = df.copy()
+    Categorical columns are encoded with sorted pd.factorize codes; the
+    returned label_encoders map each feature to its labels Index
+    (uniques[code] gives back the label).
+    """
+    # Columns are taken as-is (no copy of df); train_models converts X to a
+    # single float32 matrix anyway, so narrowing dtypes here would be undone
+    columns = {col: df[col] for col in ('is_organic', 'purchase_season', 'temperature_avg')}
     
-    for feature in categorical_features:
-        le = LabelEncoder()
-        df_encoded[feature] = le.fit_transform(df[feature])
-        label_encoders[feature] = le
+    # Encode categorical variables
+    label_encoders = {}
+    for feature in CATEGORICAL_FEATURES:
+        codes, uniques = pd.factorize(df[feature], sort=True)
+        columns[feature] = codes
+        label_encoders[feature] = uniques
     
-    # Features and target
-    feature_columns = ['category', 'storage_location', 'brand_type', 'is_organic', 
-                      'purchase_season', 'temperature_avg']
-    X = df_encoded[feature_columns]
-    y = df_encoded['shelf_life_days']
+    X = pd.DataFrame(columns, columns=FEATURE_COLUMNS)
+    y = df['shelf_life_days']
     
     return X, y, label_encoders
 
-def train_models(X, y, label_encoders) -> dict:
-    """Train multiple models and return the best one."""
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def resolve_lgbm_device(requested: str) -> str:
+    """Return the LightGBM device to train on, falling back to CPU when unavailable."""
+    if requested == 'cpu':
+        return 'cpu'
     
-    models = {
-        'random_forest': RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1),
-        'gradient_boosting': GradientBoostingRegressor(n_estimators=100, random_state=42),
-        'lightgbm': lgb.LGBMRegressor(n_estimators=100, random_state=42, verbose=-1)
+    # One boosting round on a tiny dataset fails fast if this build lacks the backend
+    try:
+        lgb.train(
+            {'device_type': requested, 'objective': 'regression', 'verbose': -1},
+            lgb.Dataset(np.zeros((8, 2)), np.zeros(8)),
+            num_boost_round=1
+        )
+        return requested
+    except lgb.basic.LightGBMError as e:
+        print(f"⚠️  LightGBM {requested} backend unavailable, using CPU: {e}")
+        return 'cpu'
+
+def _lgb_r2(preds, data):
+    """R² eval metric for lgb.cv, matching cross_val_score's scoring='r2'."""
+    return 'r2', r2_score(data.get_label(), preds), True
+
+def _lgb_cv_scores(model, X_train, y_train):
+    """5-fold R² for a LightGBM model via lgb.cv, reusing one pre-binned Dataset."""
+    params = model.get_params()
+    cv_params = {
+        'objective': 'regression',
+        'metric': 'None',
+        'verbose': -1,
+        'seed': params['random_state'],
+        'num_threads': params['n_jobs'],
     }
+    # Carry over device settings (device_type, max_bin, ...) set on the estimator
+    for key in ('device_type', 'max_bin', 'gpu_use_dp', 'max_cat_to_onehot'):
+        if key in params:
+            cv_params[key] = params[key]
     
-    results = {}
+    cv_result = lgb.cv(
+        cv_params,
+        lgb.Dataset(X_train, label=y_train, categorical_feature=CATEGORICAL_INDICES),
+        num_boost_round=params['n_estimators'],
+        nfold=5,
+        stratified=False,
+        seed=params['random_state'],
+        feval=_lgb_r2
+    )
+    # Scores after the final round, like refitting the full estimator per fold
+    return cv_result['valid r2-mean'][-1], cv_result['valid r2-stdv'][-1]
+
+def _limit_threads(n_threads):
+    """Pool initializer: cap native thread pools in a CV fold worker."""
+    threadpool_limits(limits=n_threads)
+
+def _train_one(model, X_train, y_train, X_test, y_test, n_jobs: int = 1) -> dict:
+    """Fit and evaluate one model (runs in a worker process).
     
-    for name, model in models.items():
-        print(f"Training {name}...")
-        
-        # Train model
-        model.fit(X_train, y_train)
-        
-        # Predictions
-        y_pred_train = model.predict(X_train)
+    n_jobs is this worker's share of the cores; the CV folds run in parallel
+    over it.
+    """
+    # Cap native thread pools (OpenMP, BLAS) at this worker's share as well;
+    # n_jobs only reaches estimators that expose it
+    with threadpool_limits(limits=n_jobs):
+        # Train model; LightGBM splits the category codes natively instead of as ordinals
+        if isinstance(model, lgb.LGBMRegressor):
+            model.fit(X_train, y_train, categorical_feature=CATEGORICAL_INDICES)
+        else:
+            model.fit(X_train, y_train)
+    
+        # Test predictions only; CV below already covers generalization
         y_pred_test = model.predict(X_test)
-        
-        # Metrics
-        train_mse = mean_squared_error(y_train, y_pred_train)
-        test_mse = mean_squared_error(y_test, y_pred_test)
-        test_mae = mean_absolute_error(y_test, y_pred_test)
-        test_r2 = r2_score(y_test, y_pred_test)
-        
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring='r2')
-        
-        results[name] = {
+    
+        # Cross-validation; LightGBM's own CV bins the data once instead of per fold
+        if isinstance(model, lgb.LGBMRegressor):
+            cv_mean, cv_std = _lgb_cv_scores(model, X_train, y_train)
+        else:
+            # Parallelize over folds, with single-threaded estimators inside each
+            # fold so the two levels don't oversubscribe the cores
+            cv_model = clone(model)
+            if 'n_jobs' in cv_model.get_params():
+                cv_model.set_params(n_jobs=1)
+            # Arrays over 1MB are memory-mapped into the fold workers, not pickled.
+            # The multiprocessing pool is closed after the call, whereas a reusable
+            # loky executor would keep this worker process from exiting. Native
+            # thread pools (e.g. HistGradientBoosting's OpenMP, which has no n_jobs)
+            # are capped at one thread per fold, in-process and in every fold worker.
+            with threadpool_limits(limits=1), joblib.parallel_config(
+                backend='multiprocessing', max_nbytes='1M',
+                initializer=_limit_threads, initargs=(1,)
+            ):
+                cv_scores = cross_val_score(
+                    cv_model, X_train, y_train, cv=5, scoring='r2',
+                    n_jobs=n_jobs, pre_dispatch='2*n_jobs'
+                )
+            cv_mean, cv_std = cv_scores.mean(), cv_scores.std()
+    
+        return {
             'model': model,
-            'train_mse': train_mse,
-            'test_mse': test_mse,
-            'test_mae': test_mae,
-            'test_r2': test_r2,
-            'cv_mean': cv_scores.mean(),
-            'cv_std': cv_scores.std(),
-            'label_encoders': label_encoders
+            'test_mse': mean_squared_error(y_test, y_pred_test),
+            'test_mae': mean_absolute_error(y_test, y_pred_test),
+            'test_r2': r2_score(y_test, y_pred_test),
+            'cv_mean': cv_mean,
+            'cv_std': cv_std
         }
+
+def train_models(X, y, label_encoders, lgbm_device: str = 'cpu', fast: bool = False) -> dict:
+    """Train multiple models and return the best one.
+    
+    The models are independent, so each is fitted in its own worker process;
+    multi-threaded models get an equal share of the cores. With fast=True only
+    LightGBM is trained.
+    """
+    # Convert once to contiguous float32 arrays so splitting, CV folds and the
+    # worker pickles slice plain numpy memory instead of going through pandas
+    X_arr = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+    y_arr = y.to_numpy(dtype=np.float32)
+    X_train, X_test, y_train, y_test = train_test_split(X_arr, y_arr, test_size=0.2, random_state=42)
+    
+    # CUDA histograms are limited to 255 bins and are fastest at 63
+    lgbm_params = {}
+    if lgbm_device == 'cuda':
+        lgbm_params = {'device_type': 'cuda', 'max_bin': 63, 'gpu_use_dp': False}
+    
+    models = {
+        # sqrt features, shallower trees and 70% bootstrap samples fit much faster;
+        # the capped depth/leaf size also regularizes the noisy synthetic target
+        'random_forest': RandomForestRegressor(
+            n_estimators=100, max_features='sqrt', max_depth=12, min_samples_leaf=20,
+            bootstrap=True, max_samples=0.7, random_state=42
+        ),
+        'hist_gbm': HistGradientBoostingRegressor(
+            max_iter=100, random_state=42, max_bins=63, early_stopping=False
+        ),
+        'lightgbm': lgb.LGBMRegressor(
+            n_estimators=100, random_state=42, verbose=-1,
+            max_cat_to_onehot=4,  # one-vs-rest splits for the tiny storage/brand sets
+            **lgbm_params
+        )
+    }
+    
+    if fast:
+        models = {'lightgbm': models['lightgbm']}
+    
+    # Split the cores between workers to avoid oversubscription
+    n_jobs = max(1, (os.cpu_count() or 1) // len(models))
+    for model in models.values():
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=n_jobs)
+    
+    with ProcessPoolExecutor(max_workers=len(models)) as executor:
+        futures = {}
+        for name, model in models.items():
+            print(f"Training {name}...")
+            futures[name] = executor.submit(_train_one, model, X_train, y_train, X_test, y_test, n_jobs)
         
-        print(f"{name} - Test R²: {test_r2:.4f}, Test MAE: {test_mae:.4f}")
+        results = {}
+        for name, future in futures.items():
+            result = future.result()
+            result['label_encoders'] = label_encoders
+            results[name] = result
+            print(f"{name} - Test R²: {result['test_r2']:.4f}, Test MAE: {result['test_mae']:.4f}")
     
     return results
 
@@ -160,11 +301,11 @@ def save_best_model(results: dict, model_dir: str = 'models'):
     
     # Save model
     model_path = os.path.join(model_dir, 'expiry_model.pkl')
-    joblib.dump(best_result['model'], model_path)
+    joblib.dump(best_result['model'], model_path, compress=MODEL_COMPRESS, protocol=PICKLE_PROTOCOL)
     
     # Save label encoders
     encoders_path = os.path.join(model_dir, 'label_encoders.pkl')
-    joblib.dump(best_result['label_encoders'], encoders_path)
+    joblib.dump(best_result['label_encoders'], encoders_path, compress=MODEL_COMPRESS, protocol=PICKLE_PROTOCOL)
     
     # Save metadata
     metadata = {
@@ -173,15 +314,19 @@ def save_best_model(results: dict, model_dir: str = 'models'):
         'test_mae': best_result['test_mae'],
         'cv_mean': best_result['cv_mean'],
         'cv_std': best_result['cv_std'],
-        'features': ['category', 'storage_location', 'brand_type', 'is_organic', 
-                    'purchase_season', 'temperature_avg'],
+        'features': FEATURE_COLUMNS,
         'trained_at': datetime.utcnow().isoformat(),
         'version': '1.0.0'
     }
     
     metadata_path = os.path.join(model_dir, 'model_metadata.json')
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    if orjson is not None:
+        # orjson returns bytes and serializes numpy scalars natively
+        with open(metadata_path, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
     
     print(f"\nModel saved to: {model_path}")
     print(f"Encoders saved to: {encoders_path}")
@@ -195,6 +340,10 @@ def main():
                        help='Number of synthetic samples to generate')
     parser.add_argument('--model-dir', type=str, default='models',
                        help='Directory to save trained model')
+    parser.add_argument('--lgbm-device', type=str, default='cpu', choices=['cpu', 'cuda'],
+                       help='LightGBM device (cuda needs a CUDA-enabled LightGBM build)')
+    parser.add_argument('--fast', action='store_true',
+                       help='Train only LightGBM instead of comparing all models')
     
     args = parser.parse_args()
     
@@ -215,7 +364,8 @@ def main():
     
     # Train models
     print("\nTraining models...")
-    results = train_models(X, y, label_encoders)
+    lgbm_device = resolve_lgbm_device(args.lgbm_device)
+    results = train_models(X, y, label_encoders, lgbm_device, fast=args.fast)
     
     # Save best model
     print("\nSaving best model...")